@@ -1,168 +1,117 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Blueprint, Flask, Response, current_app, request, jsonify, send_file
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 from werkzeug.security import generate_password_hash, check_password_hash
-import sqlite3
+import click
+import csv
+import io
 import os
 from datetime import datetime
 
-app = Flask(__name__)
-CORS(app, supports_credentials=True)
+from archive import (
+    ACADEMIC_YEAR_START_MONTH, ARCHIVE_FOLDER, archive_finalized,
+    attached_archives, available_years, union_sql,
+)
+from assets import BUILD_FOLDER, FRONTEND_FOLDER, build_assets, frontend, needs_build
+from db import DATABASE, bootstrap_db, get_db, seed_admins
+from ratelimit import LIMITS, QUEUE_BUDGET, init_admission
+from scheduler import BATCH_SIZE, JOBS, NOTIFICATION_RETENTION_DAYS, run_job, start_scheduler
+
+api = Blueprint("api", __name__)
 
 
 # CONFIG
 UPLOAD_FOLDER = "uploads"
 ALLOWED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg"}
 
-app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
-app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10 MB
-
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-# DATABASE
-def get_db():
-    conn = sqlite3.connect("users.db", timeout=30)
-    conn.row_factory = sqlite3.Row
-    return conn
-
-def init_db():
-    conn = get_db()
-    cur = conn.cursor()
-
-    # USERS
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT,
-        phone TEXT,
-        email TEXT UNIQUE,
-        address TEXT,
-        dob TEXT,
-        gender TEXT,
-        father_name TEXT,
-        father_phone TEXT,
-        mother_name TEXT,
-        mother_phone TEXT,
-        password TEXT,
-        role TEXT DEFAULT 'USER'
-    )
-    """)
-
-    # ACADEMICS (STEP 3)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS academics (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER UNIQUE,
-        school10 TEXT,
-        board10 TEXT,
-        year10 TEXT,
-        cgpa10 TEXT,
-        school12 TEXT,
-        board12 TEXT,
-        year12 TEXT,
-        cgpa12 TEXT,
-        course TEXT,
-        prn TEXT,
-        graduation_year TEXT,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    """)
-
-    # DOCUMENTS
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS documents (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        doc_type TEXT,
-        file_path TEXT,
-        uploaded_at TEXT,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    """)
-
-
-    # LEAVE REQUESTS
-    cur.execute("""
-CREATE TABLE IF NOT EXISTS leave_requests (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    user_id INTEGER,
-    student_name TEXT,
-    course_year TEXT,
-    room_no TEXT,
-    from_date TEXT,
-    to_date TEXT,
-    reason TEXT,
-    leave_address TEXT,
-    self_contact TEXT,
-    parent_contact TEXT,
-    guardian_contact TEXT,
-    coming_date TEXT,
-    remark TEXT,
-    selected_admins TEXT,   -- 🔥 ADD THIS
-    status TEXT DEFAULT 'PENDING',
-    total_approvals INTEGER DEFAULT 0,
-    created_at TEXT,
-    FOREIGN KEY (user_id) REFERENCES users(id)
-)
-""")
-
-
-    # LEAVE APPROVALS
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS leave_approvals (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        leave_id INTEGER,
-        admin_id INTEGER,
-        status TEXT,
-        approved_at TEXT,
-        FOREIGN KEY (leave_id) REFERENCES leave_requests(id),
-        FOREIGN KEY (admin_id) REFERENCES users(id)
-    )
-    """)
-
-    # NOTIFICATIONS
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS notifications (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        message TEXT,
-        is_read INTEGER DEFAULT 0,
-        created_at TEXT,
-        FOREIGN KEY (user_id) REFERENCES users(id)
-    )
-    """)
-
-        # ==============================
-    # INSERT 4 FIXED ADMINS (IF NOT EXISTS)
-    # ==============================
-
-    fixed_admins = [
-        ("Hostel Incharge", "9000000001", "InchargeHostel@pccoe.com"),
-        ("Ms. Shivani Pandey", "9000000002", "shivani@pccoe.com"),
-        ("Mr. Sandeep Patel", "9000000003", "sandeep@pccoe.com"),
-        ("Ms. Rachana Ma'am", "9000000004", "rachana@pccoe.com"),
-    ]
 
-    for name, phone, email in fixed_admins:
-        cur.execute("SELECT id FROM users WHERE email=?", (email,))
-        if not cur.fetchone():
-            cur.execute("""
-                INSERT INTO users
-                (name, phone, email, address, dob, gender,
-                 father_name, father_phone, mother_name, mother_phone,
-                 password, role)
-                VALUES (?, ?, ?, '', '', '', '', '', '', '', ?, 'ADMIN')
-            """, (
-                name,
-                phone,
-                email,
-                generate_password_hash("admin123")
-            ))
-
-    conn.commit()
-    conn.close()
+# ==============================
+# APP FACTORY
+# ==============================
+def create_app(config=None):
+    app = Flask(__name__)
+    CORS(app, supports_credentials=True)
+
+    app.config["DATABASE"] = DATABASE
+    app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+    app.config["MAX_CONTENT_LENGTH"] = 10 * 1024 * 1024  # 10 MB
+    app.config["ARCHIVE_FOLDER"] = ARCHIVE_FOLDER
+    app.config["ACADEMIC_YEAR_START_MONTH"] = ACADEMIC_YEAR_START_MONTH
+    app.config["FRONTEND_FOLDER"] = FRONTEND_FOLDER
+    app.config["BUILD_FOLDER"] = BUILD_FOLDER
+    app.config["API_BASE_URL"] = ""  # same origin as the pages
+    app.config["SCHEDULER_ENABLED"] = False
+    app.config["SCHEDULER_BATCH_SIZE"] = BATCH_SIZE
+    app.config["NOTIFICATION_RETENTION_DAYS"] = NOTIFICATION_RETENTION_DAYS
+    app.config["ADMISSION_ENABLED"] = True
+    app.config["ADMISSION_LIMITS"] = LIMITS
+    app.config["ADMISSION_QUEUE_BUDGET"] = QUEUE_BUDGET
+    app.config["RATE_LIMIT_DB"] = None  # e.g. "ratelimit.db" to share limits across workers
+    app.config["TRUSTED_PROXIES"] = 0  # reverse proxies in front of the app (nginx = 1)
+    if config:
+        app.config.update(config)
+
+    # Without this, every client behind the proxy shares one rate-limit bucket
+    if app.config["TRUSTED_PROXIES"]:
+        hops = app.config["TRUSTED_PROXIES"]
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
+
+    os.makedirs(app.config["UPLOAD_FOLDER"], exist_ok=True)
+
+    # Returns immediately when the stored schema fingerprint matches
+    bootstrap_db(app.config["DATABASE"])
+
+    app.register_blueprint(api)
+    app.register_blueprint(frontend)
+
+    # A fresh checkout or an edited page would otherwise serve 404s or stale HTML
+    if needs_build(app.config["FRONTEND_FOLDER"], app.config["BUILD_FOLDER"]):
+        build_assets(app.config["FRONTEND_FOLDER"], app.config["BUILD_FOLDER"])
+    init_admission(app)
+
+    # Safe to enable in every worker: only the lease holder runs jobs
+    if app.config["SCHEDULER_ENABLED"]:
+        start_scheduler(app)
+
+    @app.cli.command("seed-admins")
+    def seed_admins_command():
+        """Insert the fixed admin accounts if they are missing."""
+        added = seed_admins(app.config["DATABASE"])
+        click.echo(f"Added {len(added)} admin(s)" if added else "Admins already present")
+
+    @app.cli.command("archive")
+    @click.option("--before", default=None,
+                  help="Archive records created before this date (default: start of current academic year).")
+    @click.option("--batch-size", default=500, show_default=True)
+    def archive_command(before, batch_size):
+        """Move finalized leaves and old notifications into yearly archive files."""
+        moved = archive_finalized(
+            app.config["DATABASE"],
+            app.config["ARCHIVE_FOLDER"],
+            before=before,
+            batch_size=batch_size,
+            start_month=app.config["ACADEMIC_YEAR_START_MONTH"],
+        )
+        for table, count in moved.items():
+            click.echo(f"{table}: {count}")
+
+    @app.cli.command("build-assets")
+    def build_assets_command():
+        """Extract, minify, hash and precompress the pages' CSS/JS."""
+        pages = build_assets(app.config["FRONTEND_FOLDER"], app.config["BUILD_FOLDER"])
+        click.echo(f"Built {len(pages)} page(s) into {app.config['BUILD_FOLDER']}")
+
+    @app.cli.command("run-jobs")
+    @click.argument("names", nargs=-1)
+    def run_jobs_command(names):
+        """Run maintenance jobs once, now (all of them if no NAMES are given)."""
+        for job in JOBS:
+            if not names or job.name in names:
+                click.echo(f"{job.name}: {run_job(job)}")
+
+    return app
 
-init_db()
 
 # HELPERS
 
@@ -170,9 +119,22 @@ def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def requested_years(years):
+    """Archive years asked for by a history/export call; "all" means every file."""
+    if years == "all":
+        return available_years(current_app.config["ARCHIVE_FOLDER"])
+    if isinstance(years, str):
+        years = [y.strip() for y in years.split(",") if y.strip()]
+    if not years:
+        return []
+    if not isinstance(years, list) or not all(isinstance(y, str) for y in years):
+        raise ValueError("years must be a list of academic years like \"2024-25\"")
+    return years
+
+
 # REGISTER (STEP 1 + STEP 3)
 
-@app.route("/register", methods=["POST"])
+@api.route("/register", methods=["POST"])
 def register():
     data = request.get_json()
     if not data:
@@ -250,7 +212,7 @@ def register():
 # ==============================
 # LOGIN
 # ==============================
-@app.route("/login", methods=["POST"])
+@api.route("/login", methods=["POST"])
 def login():
     data = request.get_json()
     conn = get_db()
@@ -268,17 +230,30 @@ def login():
 # ==============================
 # UPLOAD DOCUMENT (STEP 2 + STEP 3)
 # ==============================
-@app.route("/upload-document", methods=["POST"])
+@api.route("/upload-document", methods=["POST"])
 def upload_document():
-    email = request.form.get("email")
-    doc_type = request.form.get("doc_type")
     file = request.files.get("file")
+    message, status = store_document(
+        request.form.get("email"),
+        request.form.get("doc_type"),
+        file.filename if file else None,
+        file.save if file else None,
+    )
+    return jsonify({"message": message}), status
+
 
-    if not all([email, doc_type, file]):
-        return jsonify({"message": "Missing data"}), 400
+def store_document(email, doc_type, filename, save):
+    """
+    Validate an upload and record it, replacing any older document of the
+    same type. `save(path)` writes the file body; the WSGI route passes
+    FileStorage.save, the ASGI route moves its already-streamed temp file.
+    Returns (message, status).
+    """
+    if not all([email, doc_type, filename]):
+        return "Missing data", 400
 
-    if not allowed_file(file.filename):
-        return jsonify({"message": "Invalid file type"}), 400
+    if not allowed_file(filename):
+        return "Invalid file type", 400
 
     conn = get_db()
     cur = conn.cursor()
@@ -287,7 +262,7 @@ def upload_document():
     user = cur.fetchone()
     if not user:
         conn.close()
-        return jsonify({"message": "User not found"}), 404
+        return "User not found", 404
 
     # 🔥 REPLACE OLD DOCUMENT IF EXISTS
     cur.execute(
@@ -297,16 +272,21 @@ def upload_document():
     old = cur.fetchone()
 
     if old:
-        if os.path.exists(old["file_path"]):
+        if current_app.config["SCHEDULER_ENABLED"]:
+            # File removal is left to the scheduler's cleanup job
+            cur.execute("""
+            INSERT INTO file_deletions (file_path, queued_at) VALUES (?, ?)
+            """, (old["file_path"], datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        elif os.path.exists(old["file_path"]):
             os.remove(old["file_path"])
         cur.execute("DELETE FROM documents WHERE id=?", (old["id"],))
 
-    filename = secure_filename(file.filename)
+    filename = secure_filename(filename)
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     new_name = f"{user['id']}_{doc_type}_{timestamp}_{filename}"
-    path = os.path.join(app.config["UPLOAD_FOLDER"], new_name)
+    path = os.path.join(current_app.config["UPLOAD_FOLDER"], new_name)
 
-    file.save(path)
+    save(path)
 
     cur.execute("""
     INSERT INTO documents (user_id, doc_type, file_path, uploaded_at)
@@ -321,12 +301,12 @@ def upload_document():
     conn.commit()
     conn.close()
 
-    return jsonify({"message": "Document uploaded"}), 201
+    return "Document uploaded", 201
 
 # ==============================
 # GET USER PROFILE
 # ==============================
-@app.route("/get-user", methods=["POST"])
+@api.route("/get-user", methods=["POST"])
 def get_user():
     email = request.json.get("email")
     conn = get_db()
@@ -349,7 +329,7 @@ def get_user():
 # ==============================
 # GET ACADEMICS
 # ==============================
-@app.route("/get-academics", methods=["POST"])
+@api.route("/get-academics", methods=["POST"])
 def get_academics():
     email = request.json.get("email")
     conn = get_db()
@@ -369,7 +349,7 @@ def get_academics():
 # ==============================
 # GET ALL DOCUMENTS
 # ==============================
-@app.route("/get-documents", methods=["POST"])
+@api.route("/get-documents", methods=["POST"])
 def get_documents():
     email = request.json.get("email")
     conn = get_db()
@@ -402,7 +382,7 @@ def get_documents():
 # ==============================
 # OPEN DOCUMENT
 # ==============================
-@app.route("/open-document/<int:doc_id>")
+@api.route("/open-document/<int:doc_id>")
 def open_document(doc_id):
     conn = get_db()
     cur = conn.cursor()
@@ -416,7 +396,7 @@ def open_document(doc_id):
 
     return send_file(doc["file_path"], as_attachment=False)
 
-@app.route("/submit-leave", methods=["POST"])
+@api.route("/submit-leave", methods=["POST"])
 def submit_leave():
     data = request.get_json()
     email = data.get("email")
@@ -479,7 +459,7 @@ def submit_leave():
 
 
 
-@app.route("/get-leaves", methods=["GET"])
+@api.route("/get-leaves", methods=["GET"])
 def get_leaves():
     conn = get_db()
     cur = conn.cursor()
@@ -497,9 +477,111 @@ def get_leaves():
     return jsonify([dict(l) for l in leaves])
 
 
-@app.route("/get-notifications", methods=["POST"])
+# ==============================
+# LEAVE HISTORY (LIVE + ARCHIVE)
+# ==============================
+@api.route("/leave-history", methods=["POST"])
+def leave_history():
+    data = request.get_json()
+    email = data.get("email")
+
+    try:
+        years = requested_years(data.get("years"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    conn = get_db()
+    cur = conn.cursor()
+
+    cur.execute("SELECT id FROM users WHERE email=?", (email,))
+    user = cur.fetchone()
+    if not user:
+        conn.close()
+        return jsonify({"message": "User not found"}), 404
+
+    try:
+        with attached_archives(conn, current_app.config["ARCHIVE_FOLDER"], years) as archives:
+            cur.execute(f"""
+            SELECT * FROM ({union_sql("leave_requests", archives)})
+            WHERE user_id=?
+            ORDER BY created_at DESC
+            """, (user["id"],))
+            leaves = [dict(l) for l in cur.fetchall()]
+
+            # Approvals are archived alongside their leave
+            cur.execute(f"""
+            SELECT a.leave_id, a.status, a.approved_at, users.name AS admin_name
+            FROM ({union_sql("leave_approvals", archives)}) AS a
+            LEFT JOIN users ON a.admin_id = users.id
+            WHERE a.leave_id IN (
+                SELECT id FROM ({union_sql("leave_requests", archives, "id, user_id")})
+                WHERE user_id=?
+            )
+            ORDER BY a.approved_at
+            """, (user["id"],))
+            approvals = cur.fetchall()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    finally:
+        conn.close()
+
+    by_leave = {}
+    for a in approvals:
+        by_leave.setdefault(a["leave_id"], []).append(
+            {"status": a["status"], "approved_at": a["approved_at"], "admin_name": a["admin_name"]}
+        )
+    for leave in leaves:
+        leave["approvals"] = by_leave.get(leave["id"], [])
+
+    return jsonify(leaves)
+
+
+# ==============================
+# EXPORT LEAVES (CSV)
+# ==============================
+@api.route("/export-leaves", methods=["GET"])
+def export_leaves():
+    conn = get_db()
+    cur = conn.cursor()
+
+    try:
+        years = requested_years(request.args.get("years"))
+        with attached_archives(conn, current_app.config["ARCHIVE_FOLDER"], years) as archives:
+            cur.execute(f"""
+            SELECT l.*, users.email
+            FROM ({union_sql("leave_requests", archives)}) AS l
+            LEFT JOIN users ON l.user_id = users.id
+            ORDER BY l.created_at DESC
+            """)
+            columns = [c[0] for c in cur.description]
+            leaves = cur.fetchall()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    finally:
+        conn.close()
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(columns)
+    writer.writerows(tuple(l) for l in leaves)
+
+    return Response(
+        out.getvalue(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=leaves.csv"},
+    )
+
+
+@api.route("/get-notifications", methods=["POST"])
 def get_notifications():
-    email = request.json.get("email")
+    data = request.get_json()
+    email = data.get("email")
+
+    # Older notifications are moved to the yearly archive files
+    try:
+        years = requested_years(data.get("years"))
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
 
     conn = get_db()
     cur = conn.cursor()
@@ -507,21 +589,26 @@ def get_notifications():
     cur.execute("SELECT id FROM users WHERE email=?", (email,))
     user = cur.fetchone()
     if not user:
+        conn.close()
         return jsonify([])
 
-    cur.execute("""
-    SELECT id, message, created_at
-    FROM notifications
-    WHERE user_id=?
-    ORDER BY created_at DESC
-    """, (user["id"],))
-
-    notes = cur.fetchall()
-    conn.close()
+    try:
+        with attached_archives(conn, current_app.config["ARCHIVE_FOLDER"], years) as archives:
+            cur.execute(f"""
+            SELECT archive, id, message, created_at
+            FROM ({union_sql("notifications", archives)})
+            WHERE user_id=?
+            ORDER BY created_at DESC
+            """, (user["id"],))
+            notes = cur.fetchall()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+    finally:
+        conn.close()
 
     return jsonify([dict(n) for n in notes])
 
-@app.route("/clear-notifications", methods=["POST"])
+@api.route("/clear-notifications", methods=["POST"])
 def clear_notifications():
     data = request.get_json()
     email = data.get("email")
@@ -545,7 +632,7 @@ def clear_notifications():
 
     return jsonify({"message": "All notifications cleared"})
 
-@app.route("/approve-leave", methods=["POST"])
+@api.route("/approve-leave", methods=["POST"])
 def approve_leave():
     data = request.get_json()
     leave_id = data.get("leave_id")
@@ -582,7 +669,7 @@ def approve_leave():
         return jsonify({"message": "Leave not found"}), 404
 
     # 🚨 STOP if leave already finalized
-    if leave["status"] in ["APPROVED", "REJECTED"]:
+    if leave["status"] in ["APPROVED", "REJECTED", "EXPIRED"]:
         conn.close()
         return jsonify({"message": "Leave already finalized"}), 400
 
@@ -690,7 +777,7 @@ def approve_leave():
 # ==============================
 # ADMIN DASHBOARD STATS
 # ==============================
-@app.route("/admin-stats", methods=["GET"])
+@api.route("/admin-stats", methods=["GET"])
 def admin_stats():
     conn = get_db()
     cur = conn.cursor()
@@ -699,9 +786,17 @@ def admin_stats():
     cur.execute("SELECT COUNT(*) as total FROM users WHERE role='USER'")
     total_users = cur.fetchone()["total"]
 
+    # Archived leaves are only kept as per-user counts in the live database
+    cur.execute("""
+        SELECT COALESCE(SUM(total), 0) as total,
+               COALESCE(SUM(CASE WHEN status='APPROVED' THEN total END), 0) as approved
+        FROM archived_leave_counts
+    """)
+    archived = cur.fetchone()
+
     # Total leaves
     cur.execute("SELECT COUNT(*) as total FROM leave_requests")
-    total_leaves = cur.fetchone()["total"]
+    total_leaves = cur.fetchone()["total"] + archived["total"]
 
     # Pending leaves (not fully approved and not rejected)
     cur.execute("""
@@ -717,7 +812,7 @@ def admin_stats():
         FROM leave_requests
         WHERE status='APPROVED'
     """)
-    approved = cur.fetchone()["total"]
+    approved = cur.fetchone()["total"] + archived["approved"]
 
     conn.close()
 
@@ -728,7 +823,7 @@ def admin_stats():
         "approved": approved
     })
 
-@app.route("/user-stats", methods=["POST"])
+@api.route("/user-stats", methods=["POST"])
 def user_stats():
     data = request.get_json()
     email = data.get("email")
@@ -746,13 +841,22 @@ def user_stats():
 
     user_id = user["id"]
 
+    # Leaves already moved to the archive files
+    cur.execute("""
+        SELECT COALESCE(SUM(total), 0) as total,
+               COALESCE(SUM(CASE WHEN status='APPROVED' THEN total END), 0) as approved
+        FROM archived_leave_counts
+        WHERE user_id=?
+    """, (user_id,))
+    archived = cur.fetchone()
+
     # Total leaves of this user
     cur.execute("""
         SELECT COUNT(*) as total
         FROM leave_requests
         WHERE user_id=?
     """, (user_id,))
-    total = cur.fetchone()["total"]
+    total = cur.fetchone()["total"] + archived["total"]
 
     # Approved leaves
     cur.execute("""
@@ -760,7 +864,7 @@ def user_stats():
         FROM leave_requests
         WHERE user_id=? AND status='APPROVED'
     """, (user_id,))
-    approved = cur.fetchone()["total"]
+    approved = cur.fetchone()["total"] + archived["approved"]
 
     # Pending leaves
     cur.execute("""
@@ -783,4 +887,4 @@ def user_stats():
 # RUN
 # ==============================
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app({"SCHEDULER_ENABLED": True}).run(debug=True)
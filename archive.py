@@ -0,0 +1,242 @@
+import os
+import re
+from contextlib import contextmanager
+from datetime import date
+
+from db import get_db
+
+ARCHIVE_FOLDER = "archive"
+ACADEMIC_YEAR_START_MONTH = 6  # June
+
+# SQLite allows 10 attached databases by default, and "main" is one of them
+MAX_ATTACHED = 9
+
+FINALIZED = ("APPROVED", "REJECTED", "EXPIRED")
+
+_YEAR_RE = re.compile(r"^\d{4}-\d{2}$")
+
+
+# ==============================
+# ACADEMIC YEARS
+# ==============================
+def academic_year(timestamp, start_month=ACADEMIC_YEAR_START_MONTH):
+    """'2024-08-10 09:00:00' -> '2024-25' (years start in start_month)."""
+    year, month = int(timestamp[:4]), int(timestamp[5:7])
+    start = year if month >= start_month else year - 1
+    return f"{start}-{(start + 1) % 100:02d}"
+
+
+def current_year_start(start_month=ACADEMIC_YEAR_START_MONTH, today=None):
+    today = today or date.today()
+    year = today.year if today.month >= start_month else today.year - 1
+    return date(year, start_month, 1).isoformat()
+
+
+def archive_path(folder, year):
+    return os.path.join(folder, f"leaves_{year}.db")
+
+
+def available_years(folder):
+    if not os.path.isdir(folder):
+        return []
+    years = []
+    for name in os.listdir(folder):
+        if name.startswith("leaves_") and name.endswith(".db"):
+            year = name[len("leaves_"):-len(".db")]
+            if _YEAR_RE.match(year):
+                years.append(year)
+    return sorted(years)
+
+
+# ==============================
+# ATTACH
+# ==============================
+def _schema_name(year):
+    return "arch_" + year.replace("-", "_")
+
+
+def _ensure_tables(conn, schema):
+    # Column layout follows the live tables, so SELECT * lines up both ways
+    for table in ("leave_requests", "leave_approvals", "notifications"):
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {schema}.{table} AS "
+            f"SELECT * FROM main.{table} WHERE 0"
+        )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.leave_requests_user "
+        f"ON leave_requests(user_id)"
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.leave_approvals_leave "
+        f"ON leave_approvals(leave_id)"
+    )
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {schema}.notifications_user "
+        f"ON notifications(user_id)"
+    )
+
+
+@contextmanager
+def attached_archives(conn, folder, years, create=False):
+    """ATTACH the archive file of each year; yields [(year, schema name)]."""
+    if len(years) > MAX_ATTACHED:
+        raise ValueError(f"At most {MAX_ATTACHED} archive years can be queried at once")
+
+    attached = []
+    try:
+        for year in years:
+            if not isinstance(year, str) or not _YEAR_RE.match(year):
+                raise ValueError(f"Invalid academic year: {year}")
+            path = archive_path(folder, year)
+            if not create and not os.path.exists(path):
+                continue
+            schema = _schema_name(year)
+            conn.execute("ATTACH DATABASE ? AS " + schema, (path,))
+            attached.append((year, schema))
+            if create:
+                _ensure_tables(conn, schema)
+        yield attached
+    finally:
+        for _, schema in attached:
+            conn.execute("DETACH DATABASE " + schema)
+
+
+def union_sql(table, archives, columns="*"):
+    """SELECT over the live table plus every attached archive copy of it."""
+    parts = [f"SELECT 'live' AS archive, {columns} FROM main.{table}"]
+    for year, schema in archives:
+        parts.append(f"SELECT '{year}' AS archive, {columns} FROM {schema}.{table}")
+    return " UNION ALL ".join(parts)
+
+
+# ==============================
+# ARCHIVE RUN
+# ==============================
+def _group_by_year(rows, start_month):
+    groups = {}
+    for row in rows:
+        groups.setdefault(academic_year(row["created_at"], start_month), []).append(row["id"])
+    return groups
+
+
+def _move_leaves(conn, schema, ids):
+    marks = ",".join("?" for _ in ids)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute(f"""
+            INSERT INTO {schema}.leave_approvals
+            SELECT * FROM main.leave_approvals WHERE leave_id IN ({marks})
+        """, ids)
+        approvals = cur.rowcount
+        cur.execute(f"DELETE FROM main.leave_approvals WHERE leave_id IN ({marks})", ids)
+
+        cur.execute(f"""
+            INSERT INTO {schema}.leave_requests
+            SELECT * FROM main.leave_requests WHERE id IN ({marks})
+        """, ids)
+        leaves = cur.rowcount
+
+        cur.execute(f"""
+            INSERT INTO main.archived_leave_counts (user_id, status, total)
+            SELECT user_id, status, COUNT(*) FROM main.leave_requests
+            WHERE id IN ({marks})
+            GROUP BY user_id, status
+            ON CONFLICT(user_id, status) DO UPDATE SET total = total + excluded.total
+        """, ids)
+        cur.execute(f"DELETE FROM main.leave_requests WHERE id IN ({marks})", ids)
+
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return leaves, approvals
+
+
+def _move_notifications(conn, schema, ids):
+    marks = ",".join("?" for _ in ids)
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute(f"""
+            INSERT INTO {schema}.notifications
+            SELECT * FROM main.notifications WHERE id IN ({marks})
+        """, ids)
+        moved = cur.rowcount
+        cur.execute(f"DELETE FROM main.notifications WHERE id IN ({marks})", ids)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return moved
+
+
+def archive_leaves(conn, folder, before, batch_size=500,
+                   start_month=ACADEMIC_YEAR_START_MONTH, on_batch=None):
+    """
+    Move finalized leaves (with their approvals) created before `before`
+    into per-academic-year archive files. Each batch is its own short
+    transaction so request handlers never wait long for the lock;
+    `on_batch(leaves)` is called after each commit and may raise to stop.
+    Returns (leaves, approvals) moved.
+    """
+    os.makedirs(folder, exist_ok=True)
+    conn.isolation_level = None  # transactions are managed explicitly
+    leaves = approvals = 0
+
+    while True:
+        rows = conn.execute(f"""
+            SELECT id, created_at FROM leave_requests
+            WHERE status IN ({",".join("?" for _ in FINALIZED)})
+              AND created_at < ?
+            ORDER BY id
+            LIMIT ?
+        """, (*FINALIZED, before, batch_size)).fetchall()
+        if not rows:
+            return leaves, approvals
+        for year, ids in _group_by_year(rows, start_month).items():
+            with attached_archives(conn, folder, [year], create=True) as archives:
+                moved, moved_approvals = _move_leaves(conn, archives[0][1], ids)
+            leaves += moved
+            approvals += moved_approvals
+            if on_batch:
+                on_batch(moved)
+
+
+def archive_notifications(conn, folder, before, batch_size=500,
+                          start_month=ACADEMIC_YEAR_START_MONTH, on_batch=None):
+    """Like archive_leaves(), for notifications; returns the number moved."""
+    os.makedirs(folder, exist_ok=True)
+    conn.isolation_level = None
+    total = 0
+
+    while True:
+        rows = conn.execute("""
+            SELECT id, created_at FROM notifications
+            WHERE created_at < ?
+            ORDER BY id
+            LIMIT ?
+        """, (before, batch_size)).fetchall()
+        if not rows:
+            return total
+        for year, ids in _group_by_year(rows, start_month).items():
+            with attached_archives(conn, folder, [year], create=True) as archives:
+                moved = _move_notifications(conn, archives[0][1], ids)
+            total += moved
+            if on_batch:
+                on_batch(moved)
+
+
+def archive_finalized(db_path=None, folder=ARCHIVE_FOLDER, before=None,
+                      batch_size=500, start_month=ACADEMIC_YEAR_START_MONTH):
+    """Archive finalized leaves and notifications created before `before`."""
+    before = before or current_year_start(start_month)
+
+    conn = get_db(db_path)
+    try:
+        leaves, approvals = archive_leaves(conn, folder, before, batch_size, start_month)
+        notifications = archive_notifications(conn, folder, before, batch_size, start_month)
+    finally:
+        conn.close()
+
+    return {"leave_requests": leaves, "leave_approvals": approvals, "notifications": notifications}
@@ -0,0 +1,365 @@
+"""
+ASGI serving mode, alongside the WSGI app from app.py:
+
+    uvicorn --factory asgi:create_asgi_app
+
+Uploads are streamed to disk as they arrive and documents are streamed back
+in chunks, so slow clients wait on the event loop instead of pinning a
+thread. Every other route runs the existing Flask view on a small, bounded
+thread pool that owns all SQLite access.
+"""
+import asyncio
+import math
+import mimetypes
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from flask import json
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from app import create_app, store_document
+from db import get_db
+from ratelimit import client_ip
+from scheduler import stop_scheduler
+
+DB_THREADS = 4
+CHUNK_SIZE = 64 * 1024
+
+_OPEN_DOCUMENT = re.compile(r"^/open-document/(\d+)$")
+
+
+# ==============================
+# HELPERS
+# ==============================
+def _header(scope, name):
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _cors_headers(scope):
+    # Same answer flask-cors gives with supports_credentials=True
+    origin = _header(scope, b"origin")
+    if not origin:
+        return []
+    return [
+        (b"access-control-allow-origin", origin.encode("latin-1")),
+        (b"access-control-allow-credentials", b"true"),
+        (b"vary", b"Origin"),
+    ]
+
+
+async def _send_body(scope, send, status, body, content_type, headers=()):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", content_type),
+            (b"content-length", str(len(body)).encode()),
+            *_cors_headers(scope),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _send_json(scope, send, status, payload, headers=()):
+    await _send_body(
+        scope, send, status, json.dumps(payload).encode(), b"application/json", headers
+    )
+
+
+async def _read_body(receive, limit):
+    """
+    Whole request body, or None if the client disconnected first. Raises
+    RequestEntityTooLarge once it exceeds `limit` bytes.
+    """
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise RequestEntityTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _in_app_context(flask_app, fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+def _document_path(doc_id):
+    conn = get_db()
+    row = conn.execute("SELECT file_path FROM documents WHERE id=?", (doc_id,)).fetchone()
+    conn.close()
+    return row["file_path"] if row else None
+
+
+# ==============================
+# WSGI BRIDGE (ALL OTHER ROUTES)
+# ==============================
+def _environ(scope, body):
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": BytesIO(body),
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    server = scope.get("server") or ("localhost", 80)
+    environ["SERVER_NAME"], environ["SERVER_PORT"] = server[0], str(server[1])
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+
+    for key, value in scope["headers"]:
+        name = key.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+
+    # The body is already fully buffered, whatever framing the client used
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    environ["CONTENT_LENGTH"] = str(len(body))
+    return environ
+
+
+def _run_wsgi(flask_app, environ):
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = headers
+
+    result = flask_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response["status"], response["headers"], body
+
+
+async def _call_flask(flask_app, pool, scope, receive, send):
+    try:
+        body = await _read_body(receive, flask_app.config["MAX_CONTENT_LENGTH"])
+    except RequestEntityTooLarge:
+        await _send_json(scope, send, 413, {"message": "Request too large"})
+        return
+    if body is None:
+        return  # nobody left to answer
+
+    loop = asyncio.get_running_loop()
+    status, headers, body = await loop.run_in_executor(
+        pool, _run_wsgi, flask_app, _environ(scope, body)
+    )
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+# ==============================
+# UPLOAD DOCUMENT (STREAMED)
+# ==============================
+async def _upload_document(flask_app, pool, scope, receive, send):
+    content_type, options = parse_options_header(_header(scope, b"content-type") or "")
+    if content_type != "multipart/form-data" or "boundary" not in options:
+        await _call_flask(flask_app, pool, scope, receive, send)
+        return
+
+    loop = asyncio.get_running_loop()
+
+    # A streamed upload holds no thread, so it is counted but not capped
+    admission = flask_app.extensions.get("admission")
+    if admission is not None:
+        ip = client_ip(
+            (scope.get("client") or (None,))[0],
+            _header(scope, b"x-forwarded-for"),
+            flask_app.config["TRUSTED_PROXIES"],
+        )
+        rejected = await loop.run_in_executor(
+            pool, admission.check_rate, "api.upload_document", ip
+        )
+        if rejected:
+            retry_after = str(max(1, math.ceil(rejected[1]))).encode()
+            await _send_json(
+                scope, send, 429, {"message": "Too many requests, try again later"},
+                [(b"retry-after", retry_after)],
+            )
+            return
+        admission.enter("api.upload_document", capped=False)
+
+    try:
+        await _stream_upload(flask_app, pool, scope, receive, send, options["boundary"])
+    finally:
+        if admission is not None:
+            admission.leave("api.upload_document", capped=False)
+
+
+async def _stream_upload(flask_app, pool, scope, receive, send, boundary):
+    loop = asyncio.get_running_loop()
+    limit = flask_app.config["MAX_CONTENT_LENGTH"]
+    decoder = MultipartDecoder(boundary.encode("latin-1"))
+
+    fields, filename = {}, None
+    part, buffer = None, []
+    fh, tmp_path = None, None
+    received, finished = 0, False
+
+    try:
+        while not finished:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if limit is not None and received > limit:
+                await _send_json(scope, send, 413, {"message": "Request too large"})
+                return
+            decoder.receive_data(chunk)
+            if not message.get("more_body"):
+                decoder.receive_data(None)
+
+            while True:
+                try:
+                    event = decoder.next_event()
+                except ValueError:
+                    await _send_json(scope, send, 400, {"message": "Invalid data"})
+                    return
+                if isinstance(event, (NeedData, Epilogue)):
+                    finished = isinstance(event, Epilogue) or not message.get("more_body")
+                    break
+                if isinstance(event, File):
+                    part = "file" if event.name == "file" and fh is None else None
+                    if part == "file":
+                        filename = event.filename
+                        fd, tmp_path = tempfile.mkstemp(
+                            suffix=".part", dir=flask_app.config["UPLOAD_FOLDER"]
+                        )
+                        fh = os.fdopen(fd, "wb")
+                elif isinstance(event, Field):
+                    part, buffer = event.name, []
+                elif isinstance(event, Data):
+                    if part == "file":
+                        await loop.run_in_executor(None, fh.write, event.data)
+                    elif part is not None:
+                        buffer.append(event.data)
+                        if not event.more_data:
+                            fields[part] = b"".join(buffer).decode("utf-8")
+
+        if fh is not None:
+            await loop.run_in_executor(None, fh.close)
+            fh = None
+
+        def save(path):
+            os.replace(tmp_path, path)
+
+        message, status = await loop.run_in_executor(
+            pool, _in_app_context, flask_app, store_document,
+            fields.get("email"), fields.get("doc_type"), filename, save,
+        )
+        await _send_json(scope, send, status, {"message": message})
+    finally:
+        if fh is not None:
+            fh.close()
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# ==============================
+# OPEN DOCUMENT (STREAMED)
+# ==============================
+async def _open_document(flask_app, pool, scope, send, doc_id):
+    loop = asyncio.get_running_loop()
+    path = await loop.run_in_executor(pool, _in_app_context, flask_app, _document_path, doc_id)
+
+    if not path or not os.path.isfile(path):
+        await _send_body(scope, send, 404, b"Not found", b"text/html; charset=utf-8")
+        return
+
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    fh = await loop.run_in_executor(None, open, path, "rb")
+    try:
+        size = os.fstat(fh.fileno()).st_size
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(size).encode()),
+                *_cors_headers(scope),
+            ],
+        })
+        while True:
+            chunk = await loop.run_in_executor(None, fh.read, CHUNK_SIZE)
+            await send({"type": "http.response.body", "body": chunk, "more_body": bool(chunk)})
+            if not chunk:
+                break
+    finally:
+        fh.close()
+
+
+# ==============================
+# APP FACTORY
+# ==============================
+def create_asgi_app(config=None):
+    flask_app = create_app(config)
+    flask_app.config.setdefault("ASGI_DB_THREADS", DB_THREADS)
+    pool = ThreadPoolExecutor(
+        max_workers=flask_app.config["ASGI_DB_THREADS"], thread_name_prefix="sqlite"
+    )
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, stop_scheduler, flask_app
+                    )
+                    pool.shutdown(wait=True)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] != "http":
+            return
+
+        method, path = scope["method"], scope["path"]
+        if method == "POST" and path == "/upload-document":
+            await _upload_document(flask_app, pool, scope, receive, send)
+            return
+
+        match = _OPEN_DOCUMENT.match(path)
+        if method == "GET" and match:
+            await _open_document(flask_app, pool, scope, send, int(match.group(1)))
+            return
+
+        await _call_flask(flask_app, pool, scope, receive, send)
+
+    app.flask_app = flask_app
+    return app
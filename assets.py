@@ -0,0 +1,252 @@
+"""
+Static asset pipeline for the HTML pages in the repo root.
+
+    flask --app app build-assets
+
+create_app() runs the same build when build/pages is missing or older than
+the pages (or this module). Inline <style>/<script> blocks are minified and written to content-hashed
+files under build/assets (with .gz/.br variants), and each page is rewritten
+to reference them. Hashed assets are served with immutable cache headers;
+pages are served with a short max-age and an ETag, with the API base URL
+filled in at render time.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+
+from flask import Blueprint, Response, abort, current_app, request, send_file
+from werkzeug.utils import secure_filename
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are built without it
+    brotli = None
+
+FRONTEND_FOLDER = os.path.dirname(os.path.abspath(__file__))
+BUILD_FOLDER = "build"
+DEFAULT_PAGE = "login.html"
+
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+PAGE_MAX_AGE = 60
+
+# Origin the pages were written against; rewritten to window.API_BASE
+DEV_API_ORIGIN = "http://127.0.0.1:5000"
+API_BASE_PLACEHOLDER = "__API_BASE__"
+
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+_STYLE = re.compile(r"<style>(.*?)</style>", re.S | re.I)
+_SCRIPT = re.compile(r"<script>(.*?)</script>", re.S | re.I)
+_HEAD = re.compile(r"<head>", re.I)
+
+frontend = Blueprint("frontend", __name__)
+
+
+# ==============================
+# MINIFY
+# ==============================
+def minify_css(css):
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def _template_lines(lines):
+    """
+    For each line, (starts inside a template literal, ends inside one).
+    Quotes, `${...}` nesting and // comments are tracked; regex literals
+    are not, which is fine for the pages' scripts.
+    """
+    stack, spans = [], []  # stack holds "`" and the "{" of each open ${...}
+    for line in lines:
+        start = bool(stack) and stack[-1] == "`"
+        quote, i = None, 0
+        while i < len(line):
+            c = line[i]
+            if quote or (stack and stack[-1] == "`"):
+                if c == "\\":
+                    i += 1
+                elif quote and c == quote:
+                    quote = None
+                elif not quote and c == "`":
+                    stack.pop()
+                elif not quote and line.startswith("${", i):
+                    stack.append("{")
+                    i += 1
+            elif c in "'\"":
+                quote = c
+            elif c == "`":
+                stack.append("`")
+            elif line.startswith("//", i):
+                break
+            elif c == "{" and stack:
+                stack.append("{")
+            elif c == "}" and stack:
+                stack.pop()
+            i += 1
+        spans.append((start, bool(stack) and stack[-1] == "`"))
+    return spans
+
+
+def minify_js(js):
+    # Line-preserving on purpose, so ASI keeps working. Only code is trimmed:
+    # lines inside template literals are kept byte for byte.
+    lines = js.splitlines()
+    out = []
+    for line, (start, end) in zip(lines, _template_lines(lines)):
+        if not start:
+            line = line.lstrip()
+        if not end:
+            line = line.rstrip()
+        if not start and (not line or line.startswith("//")):
+            continue
+        out.append(line)
+    return "\n".join(out)
+
+
+def rewrite_api_base(js):
+    js = js.replace("`" + DEV_API_ORIGIN, "`${window.API_BASE}")
+    return re.sub(r"([\"'])" + re.escape(DEV_API_ORIGIN), r"window.API_BASE + \1", js)
+
+
+# ==============================
+# BUILD
+# ==============================
+def _write_file(path, data):
+    # Workers may build at the same time; readers only ever see whole files
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.dirname(path)), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_asset(folder, stem, ext, content, written):
+    data = content.encode("utf-8")
+    name = f"{stem}-{hashlib.sha256(data).hexdigest()[:10]}.{ext}"
+    path = os.path.join(folder, name)
+
+    if name not in written:
+        _write_file(path, data)
+        variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants[".br"] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                _write_file(path + suffix, compressed)
+                written.add(name + suffix)
+        written.add(name)
+
+    return name
+
+
+def build_page(html, stem, assets_folder, written):
+    html = _COMMENT.sub("", html)
+
+    def style(match):
+        name = _write_asset(assets_folder, stem, "css", minify_css(match.group(1)), written)
+        return f'<link rel="stylesheet" href="/assets/{name}">'
+
+    def script(match):
+        js = minify_js(rewrite_api_base(match.group(1)))
+        name = _write_asset(assets_folder, stem, "js", js, written)
+        return f'<script src="/assets/{name}"></script>'
+
+    html = _STYLE.sub(style, html)
+    html = _SCRIPT.sub(script, html)
+    return _HEAD.sub(
+        f"<head>\n<script>window.API_BASE = {API_BASE_PLACEHOLDER};</script>", html, count=1
+    )
+
+
+def build_assets(source=FRONTEND_FOLDER, dest=BUILD_FOLDER):
+    """Build every *.html in `source` into `dest`; returns the page names."""
+    assets_folder = os.path.join(dest, "assets")
+    pages_folder = os.path.join(dest, "pages")
+    os.makedirs(assets_folder, exist_ok=True)
+    os.makedirs(pages_folder, exist_ok=True)
+
+    written, pages = set(), []
+    for name in sorted(os.listdir(source)):
+        if not name.endswith(".html"):
+            continue
+        with open(os.path.join(source, name), encoding="utf-8") as f:
+            html = f.read()
+        stem = os.path.splitext(name)[0]
+        page = build_page(html, stem, assets_folder, written)
+        _write_file(os.path.join(pages_folder, name), page.encode("utf-8"))
+        pages.append(name)
+
+    # Drop assets left over from older builds
+    for name in os.listdir(assets_folder):
+        if name not in written:
+            os.remove(os.path.join(assets_folder, name))
+
+    return pages
+
+
+def needs_build(source=FRONTEND_FOLDER, dest=BUILD_FOLDER):
+    """True when a built page is missing or older than its source or this module."""
+    pipeline = os.path.getmtime(__file__)
+    for name in os.listdir(source):
+        if not name.endswith(".html"):
+            continue
+        built = os.path.join(dest, "pages", name)
+        changed = max(pipeline, os.path.getmtime(os.path.join(source, name)))
+        if not os.path.exists(built) or os.path.getmtime(built) < changed:
+            return True
+    return False
+
+
+# ==============================
+# SERVE
+# ==============================
+@frontend.route("/")
+def index():
+    return page(DEFAULT_PAGE[:-len(".html")])
+
+
+@frontend.route("/<name>.html")
+def page(name):
+    path = os.path.join(current_app.config["BUILD_FOLDER"], "pages", secure_filename(name + ".html"))
+    if not os.path.isfile(path):
+        abort(404)
+
+    with open(path, encoding="utf-8") as f:
+        html = f.read()
+    html = html.replace(API_BASE_PLACEHOLDER, json.dumps(current_app.config["API_BASE_URL"]), 1)
+
+    resp = Response(html, mimetype="text/html")
+    resp.cache_control.public = True
+    resp.cache_control.max_age = PAGE_MAX_AGE
+    resp.add_etag()
+    return resp.make_conditional(request)
+
+
+@frontend.route("/assets/<name>")
+def asset(name):
+    path = os.path.join(current_app.config["BUILD_FOLDER"], "assets", secure_filename(name))
+    if not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    for candidate, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            path, encoding = path + suffix, candidate
+            break
+
+    resp = send_file(
+        os.path.abspath(path),
+        mimetype=mimetypes.guess_type(name)[0],
+        download_name=name,
+        max_age=ASSET_MAX_AGE,
+    )
+    resp.cache_control.immutable = True
+    resp.vary.add("Accept-Encoding")
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    return resp
@@ -0,0 +1,143 @@
+"""Concurrent-connection capacity: WSGI (gunicorn gthread) vs ASGI (uvicorn).
+
+    python benchmarks/concurrency.py --slow 8 32 128
+
+For each server, opens N slow clients that start a 1 MB POST /upload-document
+and then stall mid-body, like mobile uploads on a bad link. While they are
+connected, several probes time GET /admin-stats. A server that pins a thread
+per slow client starts failing probes once the slow clients fill a worker's
+threads. Which worker accepts each connection varies, so the result is a
+success rate with latency percentiles rather than a single pass/fail.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+
+ASGI_SERVER = """
+import sys
+sys.path.insert(0, {root!r})
+import uvicorn
+from asgi import create_asgi_app
+uvicorn.run(create_asgi_app({config!r}), host={host!r}, port={port}, log_level="warning")
+"""
+
+
+def wsgi_command(config, port, args):
+    return [
+        sys.executable, "-m", "gunicorn",
+        "--chdir", ROOT,
+        "-k", "gthread", "-w", str(args.workers), "--threads", str(args.threads),
+        "--preload",  # every worker has the app loaded before the port opens
+        "-b", f"{HOST}:{port}", "--log-level", "warning",
+        f"app:create_app({config!r})",
+    ]
+
+
+def asgi_command(config, port, args):
+    code = ASGI_SERVER.format(root=ROOT, config=config, host=HOST, port=port)
+    return [sys.executable, "-c", code]
+
+
+async def wait_ready(port, timeout=15):
+    # A bound port is not enough: wait until the app answers
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if await probe(port, 1) is not None:
+            return
+        await asyncio.sleep(0.1)
+    raise SystemExit(f"server on port {port} did not start")
+
+
+async def slow_client(port, stop):
+    boundary = "benchboundary"
+    head = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="x.pdf"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(
+        f"POST /upload-document HTTP/1.1\r\nHost: {HOST}\r\n"
+        f"Content-Type: multipart/form-data; boundary={boundary}\r\n"
+        f"Content-Length: {1024 * 1024}\r\n\r\n".encode() + head + b"x" * 1024
+    )
+    await writer.drain()
+    await stop.wait()
+    writer.close()
+
+
+async def probe(port, timeout):
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(HOST, port), timeout)
+        writer.write(f"GET /admin-stats HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n\r\n".encode())
+        await writer.drain()
+        status = await asyncio.wait_for(reader.readline(), timeout)
+        writer.close()
+    except (asyncio.TimeoutError, OSError):
+        return None
+    if b" 200 " not in status:
+        return None
+    return (time.perf_counter() - start) * 1000
+
+
+async def measure(port, slow, probes, timeout):
+    stop = asyncio.Event()
+    clients = [asyncio.create_task(slow_client(port, stop)) for _ in range(slow)]
+    await asyncio.sleep(1)  # let every slow client get accepted
+    latencies = [await probe(port, timeout) for _ in range(probes)]
+    stop.set()
+    await asyncio.gather(*clients, return_exceptions=True)
+    return latencies
+
+
+def summarize(latencies):
+    ok = sorted(l for l in latencies if l is not None)
+    result = f"ok={len(ok)}/{len(latencies)}"
+    if ok:
+        p95 = ok[min(len(ok) - 1, int(len(ok) * 0.95))]
+        result += f"  p50={statistics.median(ok):7.1f} ms  p95={p95:7.1f} ms"
+    return result
+
+
+def run_server(label, command, port, args):
+    proc = subprocess.Popen(command)
+    try:
+        asyncio.run(wait_ready(port))
+        for slow in args.slow:
+            latencies = asyncio.run(measure(port, slow, args.probes, args.timeout))
+            print(f"{label:<5} slow clients={slow:<5} {summarize(latencies)}")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slow", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--probes", type=int, default=10)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {"DATABASE": os.path.join(tmp, "bench.db"),
+                  "UPLOAD_FOLDER": os.path.join(tmp, "uploads"),
+                  # Every slow client shares one IP; measure serving, not limits
+                  "ADMISSION_ENABLED": False}
+        run_server("wsgi", wsgi_command(config, args.port, args), args.port, args)
+        run_server("asgi", asgi_command(config, args.port + 1, args), args.port + 1, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Import-to-first-request time for N workers starting at once.
+
+    python benchmarks/startup.py --workers 8
+
+Each worker is a fresh interpreter that imports app.py, builds the app and
+serves one GET /admin-stats through the test client, like a gunicorn worker
+booting. Runs twice against a scratch database: once cold (schema missing)
+and once warm (schema fingerprint already stored).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app import create_app
+app = create_app({{"DATABASE": {db!r}, "UPLOAD_FOLDER": {uploads!r}}})
+resp = app.test_client().get("/admin-stats")
+assert resp.status_code == 200, resp.status_code
+print(time.perf_counter() - t0)
+"""
+
+
+def run_round(workers, db, uploads):
+    code = WORKER.format(root=ROOT, db=db, uploads=uploads)
+    procs = [
+        subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    times = []
+    for p in procs:
+        out, _ = p.communicate()
+        if p.returncode != 0:
+            raise SystemExit(f"worker failed with exit code {p.returncode}")
+        times.append(float(out.strip()) * 1000)
+    return times
+
+
+def report(label, times):
+    print(f"{label:<6} n={len(times):<3} "
+          f"median={statistics.median(times):7.1f} ms  max={max(times):7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "bench.db")
+        uploads = os.path.join(tmp, "uploads")
+        report("cold", run_round(args.workers, db, uploads))
+        report("warm", run_round(args.workers, db, uploads))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+import hashlib
+import sqlite3
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash
+
+DATABASE = "users.db"
+
+
+# ==============================
+# CONNECTION
+# ==============================
+def get_db(path=None):
+    if path is None:
+        path = current_app.config["DATABASE"] if has_app_context() else DATABASE
+    conn = sqlite3.connect(path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+# ==============================
+# SCHEMA
+# ==============================
+SCHEMA = [
+    # USERS
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT,
+        phone TEXT,
+        email TEXT UNIQUE,
+        address TEXT,
+        dob TEXT,
+        gender TEXT,
+        father_name TEXT,
+        father_phone TEXT,
+        mother_name TEXT,
+        mother_phone TEXT,
+        password TEXT,
+        role TEXT DEFAULT 'USER'
+    )
+    """,
+
+    # ACADEMICS (STEP 3)
+    """
+    CREATE TABLE IF NOT EXISTS academics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER UNIQUE,
+        school10 TEXT,
+        board10 TEXT,
+        year10 TEXT,
+        cgpa10 TEXT,
+        school12 TEXT,
+        board12 TEXT,
+        year12 TEXT,
+        cgpa12 TEXT,
+        course TEXT,
+        prn TEXT,
+        graduation_year TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+
+    # DOCUMENTS
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        doc_type TEXT,
+        file_path TEXT,
+        uploaded_at TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+
+    # LEAVE REQUESTS
+    """
+    CREATE TABLE IF NOT EXISTS leave_requests (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        student_name TEXT,
+        course_year TEXT,
+        room_no TEXT,
+        from_date TEXT,
+        to_date TEXT,
+        reason TEXT,
+        leave_address TEXT,
+        self_contact TEXT,
+        parent_contact TEXT,
+        guardian_contact TEXT,
+        coming_date TEXT,
+        remark TEXT,
+        selected_admins TEXT,
+        status TEXT DEFAULT 'PENDING',
+        total_approvals INTEGER DEFAULT 0,
+        created_at TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+
+    # LEAVE APPROVALS
+    """
+    CREATE TABLE IF NOT EXISTS leave_approvals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        leave_id INTEGER,
+        admin_id INTEGER,
+        status TEXT,
+        approved_at TEXT,
+        FOREIGN KEY (leave_id) REFERENCES leave_requests(id),
+        FOREIGN KEY (admin_id) REFERENCES users(id)
+    )
+    """,
+
+    # NOTIFICATIONS
+    """
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        message TEXT,
+        is_read INTEGER DEFAULT 0,
+        created_at TEXT,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """,
+
+    # PER-USER COUNTS OF ARCHIVED LEAVES (keeps dashboard totals whole)
+    """
+    CREATE TABLE IF NOT EXISTS archived_leave_counts (
+        user_id INTEGER,
+        status TEXT,
+        total INTEGER DEFAULT 0,
+        PRIMARY KEY (user_id, status)
+    )
+    """,
+
+    # FILES WAITING TO BE DELETED (replaced uploads)
+    """
+    CREATE TABLE IF NOT EXISTS file_deletions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        file_path TEXT,
+        queued_at TEXT
+    )
+    """,
+
+    # SCHEDULER LEADER LEASE
+    """
+    CREATE TABLE IF NOT EXISTS scheduler_lease (
+        name TEXT PRIMARY KEY,
+        owner TEXT,
+        expires_at REAL
+    )
+    """,
+
+    # SCHEDULER JOB RUNS
+    """
+    CREATE TABLE IF NOT EXISTS job_runs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        job TEXT,
+        started_at TEXT,
+        duration_ms REAL,
+        rows INTEGER,
+        status TEXT,
+        error TEXT
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS job_runs_job ON job_runs(job, started_at)
+    """,
+]
+
+# Stored in PRAGMA user_version. Any edit to SCHEMA changes it, so the
+# next bootstrap re-applies the statements; otherwise startup is one read.
+SCHEMA_FINGERPRINT = int(
+    hashlib.sha256("\n".join(" ".join(s.split()) for s in SCHEMA).encode()).hexdigest()[:7],
+    16,
+)
+
+_bootstrapped = set()
+
+
+def bootstrap_db(path=None):
+    """Create missing tables once; returns False when the schema was already current."""
+    path = path or DATABASE
+    if path in _bootstrapped:
+        return False
+
+    conn = get_db(path)
+    try:
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_FINGERPRINT:
+            _bootstrapped.add(path)
+            return False
+
+        # Take the write lock, then check again: another worker may have won.
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_FINGERPRINT:
+            conn.rollback()
+            _bootstrapped.add(path)
+            return False
+
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_FINGERPRINT}")
+        conn.commit()
+    finally:
+        conn.close()
+
+    _bootstrapped.add(path)
+    return True
+
+
+# ==============================
+# FIXED ADMINS
+# ==============================
+FIXED_ADMINS = [
+    ("Hostel Incharge", "9000000001", "InchargeHostel@pccoe.com"),
+    ("Ms. Shivani Pandey", "9000000002", "shivani@pccoe.com"),
+    ("Mr. Sandeep Patel", "9000000003", "sandeep@pccoe.com"),
+    ("Ms. Rachana Ma'am", "9000000004", "rachana@pccoe.com"),
+]
+
+
+def seed_admins(path=None, password="admin123"):
+    """Insert any missing fixed admins; returns the emails that were added."""
+    conn = get_db(path)
+    try:
+        placeholders = ",".join("?" for _ in FIXED_ADMINS)
+        existing = {
+            row["email"]
+            for row in conn.execute(
+                f"SELECT email FROM users WHERE email IN ({placeholders})",
+                [email for _, _, email in FIXED_ADMINS],
+            )
+        }
+        missing = [a for a in FIXED_ADMINS if a[2] not in existing]
+        if not missing:
+            return []
+
+        # Hash only for admins that actually get inserted
+        hashed = generate_password_hash(password)
+        conn.executemany("""
+            INSERT OR IGNORE INTO users
+            (name, phone, email, address, dob, gender,
+             father_name, father_phone, mother_name, mother_phone,
+             password, role)
+            VALUES (?, ?, ?, '', '', '', '', '', '', '', ?, 'ADMIN')
+        """, [(name, phone, email, hashed) for name, phone, email in missing])
+        conn.commit()
+        return [email for _, _, email in missing]
+    finally:
+        conn.close()
@@ -0,0 +1,7 @@
+# gunicorn -c gunicorn.conf.py "app:create_app({'SCHEDULER_ENABLED': True})"
+
+
+def worker_exit(server, worker):
+    # Let the scheduler finish its job and release the lease before the worker exits
+    from scheduler import stop_scheduler
+    stop_scheduler()
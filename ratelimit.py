@@ -0,0 +1,258 @@
+"""
+Admission control for the write and auth endpoints.
+
+Each limited endpoint gets token buckets per client IP and, where the body
+names an account, per email or per email and IP. It also gets a per-process
+concurrency cap.
+A request that cannot get a slot within the queue budget is shed with 503
+and Retry-After, rather than piling up behind scrypt hashes and the SQLite
+write lock. Buckets live in memory by default. Set RATE_LIMIT_DB to share
+them between workers through a small SQLite file, kept apart from users.db
+so limiter writes never contend with app writes.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from flask import current_app, g, jsonify, request
+
+# endpoint -> {"ip" | "account" | "account_ip": (burst, tokens/sec), "concurrency": n}
+# Login uses account_ip: a bucket per account alone would let anyone lock out
+# a known account (the admin emails are public) with a few wrong passwords.
+LIMITS = {
+    "api.login": {"ip": (20, 1.0), "account_ip": (5, 1 / 30), "concurrency": 4},
+    "api.register": {"ip": (5, 1 / 10), "concurrency": 2},
+    "api.submit_leave": {"ip": (10, 1 / 2), "account": (3, 1 / 60), "concurrency": 4},
+    "api.upload_document": {"ip": (10, 1 / 5), "concurrency": 4},
+}
+
+QUEUE_BUDGET = 0.5  # seconds a request may wait for a concurrency slot
+SHED_RETRY_AFTER = 1
+MAX_MEMORY_KEYS = 10000
+
+
+# ==============================
+# TOKEN BUCKETS
+# ==============================
+class MemoryBuckets:
+    """Per-process buckets; least recently used keys are dropped past max_keys."""
+
+    def __init__(self, max_keys=MAX_MEMORY_KEYS):
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._max_keys = max_keys
+        self._lock = threading.Lock()
+
+    def take(self, key, burst, rate):
+        """Take one token; returns 0 when allowed, else seconds until one is free."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class SqliteBuckets:
+    """Buckets shared by every worker on the host, one UPSERT per check."""
+
+    PRUNE_EVERY = 1000
+    IDLE_SECONDS = 3600
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS rate_buckets (
+            key TEXT PRIMARY KEY,
+            tokens REAL,
+            updated_at REAL
+        )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, burst, rate):
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute("""
+            INSERT INTO rate_buckets (key, tokens, updated_at) VALUES (:key, :burst - 1, :now)
+            ON CONFLICT(key) DO UPDATE
+            SET tokens = MIN(:burst, tokens + (:now - updated_at) * :rate) - 1,
+                updated_at = :now
+            WHERE MIN(:burst, tokens + (:now - updated_at) * :rate) >= 1
+        """, {"key": key, "burst": burst, "rate": rate, "now": now})
+        allowed = cur.rowcount == 1
+        wait = 0
+        if not allowed:
+            tokens, updated = conn.execute(
+                "SELECT tokens, updated_at FROM rate_buckets WHERE key=?", (key,)
+            ).fetchone()
+            wait = (1 - min(burst, tokens + (now - updated) * rate)) / rate
+
+        self._calls += 1
+        if self._calls % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.IDLE_SECONDS,))
+        conn.commit()
+        return wait
+
+
+# ==============================
+# ADMISSION
+# ==============================
+class Admission:
+    def __init__(self, limits, queue_budget, buckets):
+        self.limits = limits
+        self.queue_budget = queue_budget
+        self.buckets = buckets
+        self._slots = {
+            endpoint: threading.BoundedSemaphore(cfg["concurrency"])
+            for endpoint, cfg in limits.items() if cfg.get("concurrency")
+        }
+        self._lock = threading.Lock()
+        self._admitted = Counter()
+        self._rejected = Counter()  # (endpoint, reason) -> count
+        self._in_flight = Counter()
+
+    def _reject(self, endpoint, reason):
+        with self._lock:
+            self._rejected[(endpoint, reason)] += 1
+
+    def check_rate(self, endpoint, ip, account=None):
+        """None when allowed, else (reason, seconds to wait)."""
+        cfg = self.limits.get(endpoint, {})
+        checks = [("ip", ip)]
+        if isinstance(account, str) and account.strip():
+            account = account.strip().lower()
+            checks.append(("account", account))
+            checks.append(("account_ip", f"{account}|{ip}" if ip else None))
+
+        for kind, value in checks:
+            if kind not in cfg or not value:
+                continue
+            burst, rate = cfg[kind]
+            wait = self.buckets.take(f"{endpoint}:{kind}:{value}", burst, rate)
+            if wait:
+                self._reject(endpoint, f"rate_limited_{kind}")
+                return f"rate_limited_{kind}", wait
+        return None
+
+    def enter(self, endpoint, capped=True):
+        """
+        Wait up to the queue budget for a slot; False means shed the request.
+        capped=False only counts the request, for work that holds no thread.
+        """
+        slot = self._slots.get(endpoint) if capped else None
+        if slot is not None and not slot.acquire(timeout=self.queue_budget):
+            self._reject(endpoint, "shed_concurrency")
+            return False
+        with self._lock:
+            self._admitted[endpoint] += 1
+            self._in_flight[endpoint] += 1
+        return True
+
+    def leave(self, endpoint, capped=True):
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+        slot = self._slots.get(endpoint) if capped else None
+        if slot is not None:
+            slot.release()
+
+    def snapshot(self):
+        with self._lock:
+            rejected = {}
+            for (endpoint, reason), count in self._rejected.items():
+                rejected.setdefault(endpoint, {})[reason] = count
+            return {
+                "admitted": dict(self._admitted),
+                "rejected": rejected,
+                "in_flight": {e: n for e, n in self._in_flight.items() if n},
+            }
+
+
+# ==============================
+# FLASK HOOKS
+# ==============================
+def client_ip(remote_addr, forwarded_for, trusted_proxies):
+    """
+    Client address as ProxyFix(x_for=trusted_proxies) would see it: the entry
+    that many hops from the right of X-Forwarded-For, else the peer address.
+    For callers that bypass Flask, like the ASGI upload route.
+    """
+    if trusted_proxies and forwarded_for:
+        hops = [h.strip() for h in forwarded_for.split(",")]
+        if len(hops) >= trusted_proxies:
+            return hops[-trusted_proxies]
+    return remote_addr
+
+
+def _account():
+    data = request.get_json(silent=True)
+    return data.get("email") if isinstance(data, dict) else None
+
+
+def _before_request():
+    admission = current_app.extensions.get("admission")
+    endpoint = request.endpoint
+    if admission is None or endpoint not in admission.limits or request.method == "OPTIONS":
+        return None
+
+    limits = admission.limits[endpoint]
+    account = _account() if "account" in limits or "account_ip" in limits else None
+    rejected = admission.check_rate(endpoint, request.remote_addr, account)
+    if rejected:
+        resp = jsonify({"message": "Too many requests, try again later"})
+        resp.status_code = 429
+        resp.headers["Retry-After"] = str(max(1, math.ceil(rejected[1])))
+        return resp
+
+    if not admission.enter(endpoint):
+        resp = jsonify({"message": "Server busy, try again shortly"})
+        resp.status_code = 503
+        resp.headers["Retry-After"] = str(SHED_RETRY_AFTER)
+        return resp
+
+    g.admission_endpoint = endpoint
+    return None
+
+
+def _teardown_request(exc):
+    endpoint = g.pop("admission_endpoint", None)
+    if endpoint is not None:
+        current_app.extensions["admission"].leave(endpoint)
+
+
+def admission_metrics():
+    admission = current_app.extensions.get("admission")
+    return jsonify(admission.snapshot() if admission else {})
+
+
+def init_admission(app):
+    if not app.config["ADMISSION_ENABLED"]:
+        return None
+
+    path = app.config["RATE_LIMIT_DB"]
+    buckets = SqliteBuckets(path) if path else MemoryBuckets()
+    admission = Admission(app.config["ADMISSION_LIMITS"], app.config["ADMISSION_QUEUE_BUDGET"], buckets)
+
+    app.extensions["admission"] = admission
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule("/admission-metrics", "admission_metrics", admission_metrics)
+    return admission
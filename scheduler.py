@@ -0,0 +1,318 @@
+"""
+In-process scheduler for maintenance jobs.
+
+Every worker that enables it runs a daemon thread, but only the holder of the
+`scheduler_lease` row does any work, so gunicorn workers never run a job
+twice. Jobs work in bounded batches, stop at their timeout, and record each
+run (duration, rows touched, status) in `job_runs`.
+"""
+import atexit
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable
+
+from flask import current_app
+
+from archive import archive_notifications
+from db import get_db
+
+TICK_SECONDS = 15
+TICK_JITTER = 5
+LEASE_SECONDS = 120  # must outlive the longest job timeout
+STOP_TIMEOUT = 30  # seconds to wait for a running job on shutdown
+BATCH_SIZE = 500
+NOTIFICATION_RETENTION_DAYS = 90
+
+# VACUUM holds the exclusive lock for its whole run (rollback-journal mode),
+# so it must finish well inside the 30s busy timeout of request connections.
+VACUUM_TIMEOUT = 10
+VACUUM_MIN_FREE = 0.2  # fraction of pages on the freelist worth reclaiming
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class JobTimeout(Exception):
+    pass
+
+
+@dataclass
+class Job:
+    name: str
+    run: Callable  # run(conn, deadline, batch_size, progress); adds to progress["rows"]
+    interval: int  # seconds between runs
+    timeout: int = 30
+    jitter: int = 60
+
+
+# ==============================
+# HELPERS
+# ==============================
+def _connect(deadline):
+    """Connection whose statements abort once `deadline` has passed."""
+    conn = get_db()
+    conn.set_progress_handler(lambda: 1 if time.monotonic() > deadline else 0, 10000)
+    return conn
+
+
+def _check(deadline):
+    if time.monotonic() > deadline:
+        raise JobTimeout()
+
+
+def _batched(conn, deadline, batch_size, progress, step):
+    """
+    Repeat `step(cur, batch_size)`, one transaction each, until a batch comes
+    back short. Committed rows are counted in `progress` as they land, so a
+    timeout still reports the work already done.
+    """
+    while True:
+        _check(deadline)
+        cur = conn.cursor()
+        touched = step(cur, batch_size)
+        conn.commit()
+        progress["rows"] += touched
+        if touched < batch_size:
+            return
+
+
+# ==============================
+# JOBS
+# ==============================
+def delete_replaced_files(conn, deadline, batch_size, progress):
+    def step(cur, limit):
+        # A same-second re-upload can reuse the replaced file's name
+        cur.execute("""
+            SELECT f.id, f.file_path,
+                   EXISTS (SELECT 1 FROM documents d WHERE d.file_path = f.file_path) AS in_use
+            FROM file_deletions f
+            ORDER BY f.id
+            LIMIT ?
+        """, (limit,))
+        rows = cur.fetchall()
+        for row in rows:
+            if not row["file_path"] or row["in_use"]:
+                continue
+            try:
+                os.remove(row["file_path"])
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Drop the row anyway so one bad path cannot wedge the queue
+                current_app.logger.warning("Could not delete %s: %s", row["file_path"], e)
+        cur.executemany("DELETE FROM file_deletions WHERE id=?", [(r["id"],) for r in rows])
+        return len(rows)
+
+    _batched(conn, deadline, batch_size, progress, step)
+
+
+def archive_old_notifications(conn, deadline, batch_size, progress):
+    # Moved, not deleted: the same yearly archive files `flask archive` writes
+    days = current_app.config["NOTIFICATION_RETENTION_DAYS"]
+    cutoff = (datetime.now() - timedelta(days=days)).strftime(TIME_FORMAT)
+
+    def on_batch(moved):
+        progress["rows"] += moved
+        _check(deadline)
+
+    archive_notifications(
+        conn,
+        current_app.config["ARCHIVE_FOLDER"],
+        cutoff,
+        batch_size,
+        current_app.config["ACADEMIC_YEAR_START_MONTH"],
+        on_batch,
+    )
+
+
+def expire_stale_leaves(conn, deadline, batch_size, progress):
+    today = datetime.now().strftime("%Y-%m-%d")
+    now = datetime.now().strftime(TIME_FORMAT)
+
+    def step(cur, limit):
+        cur.execute("""
+            SELECT id, user_id FROM leave_requests
+            WHERE status='PENDING' AND from_date < ?
+            LIMIT ?
+        """, (today, limit))
+        rows = cur.fetchall()
+        cur.executemany(
+            "UPDATE leave_requests SET status='EXPIRED' WHERE id=? AND status='PENDING'",
+            [(r["id"],) for r in rows],
+        )
+        cur.executemany("""
+            INSERT INTO notifications (user_id, message, created_at)
+            VALUES (?, ?, ?)
+        """, [
+            (r["user_id"], "Your leave request expired before it was approved.", now)
+            for r in rows
+        ])
+        return len(rows)
+
+    _batched(conn, deadline, batch_size, progress, step)
+
+
+def optimize(conn, deadline, batch_size, progress):
+    conn.execute("PRAGMA optimize")
+
+
+def vacuum(conn, deadline, batch_size, progress):
+    free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    if free < pages * VACUUM_MIN_FREE:
+        return
+    conn.execute("VACUUM")
+    progress["rows"] += free  # pages reclaimed
+
+
+JOBS = [
+    Job("delete-replaced-files", delete_replaced_files, interval=5 * 60),
+    Job("expire-stale-leaves", expire_stale_leaves, interval=60 * 60),
+    Job("archive-notifications", archive_old_notifications, interval=6 * 60 * 60),
+    Job("optimize", optimize, interval=6 * 60 * 60),
+    Job("vacuum", vacuum, interval=7 * 24 * 60 * 60, timeout=VACUUM_TIMEOUT, jitter=60 * 60),
+]
+
+
+# ==============================
+# RUNNING JOBS
+# ==============================
+def run_job(job):
+    """Run one job now and record it in job_runs; returns the recorded status."""
+    started_at = datetime.now().strftime(TIME_FORMAT)
+    start = time.monotonic()
+    deadline = start + job.timeout
+    progress = {"rows": 0}
+    status, error = "ok", None
+
+    conn = _connect(deadline)
+    try:
+        job.run(conn, deadline, current_app.config["SCHEDULER_BATCH_SIZE"], progress)
+    except JobTimeout:
+        conn.rollback()
+        status = "timeout"
+    except Exception as e:
+        conn.rollback()
+        # Statements cut off by the progress handler surface as "interrupted"
+        status = "timeout" if time.monotonic() > deadline else "error"
+        error = str(e)
+    finally:
+        conn.close()
+
+    conn = get_db()
+    conn.execute("""
+        INSERT INTO job_runs (job, started_at, duration_ms, rows, status, error)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (job.name, started_at, (time.monotonic() - start) * 1000, progress["rows"], status, error))
+    conn.commit()
+    conn.close()
+    return status
+
+
+def _last_runs():
+    conn = get_db()
+    rows = conn.execute("SELECT job, MAX(started_at) AS last FROM job_runs GROUP BY job").fetchall()
+    conn.close()
+    return {
+        r["job"]: datetime.strptime(r["last"], TIME_FORMAT).timestamp()
+        for r in rows if r["last"]
+    }
+
+
+def _acquire_lease(owner):
+    """Take or renew the leader lease; True when `owner` holds it."""
+    now = time.time()
+    conn = get_db()
+    try:
+        conn.execute("""
+            INSERT INTO scheduler_lease (name, owner, expires_at)
+            VALUES ('scheduler', ?, ?)
+            ON CONFLICT(name) DO UPDATE
+            SET owner=excluded.owner, expires_at=excluded.expires_at
+            WHERE scheduler_lease.owner=excluded.owner
+               OR scheduler_lease.expires_at < ?
+        """, (owner, now + LEASE_SECONDS, now))
+        conn.commit()
+        row = conn.execute("SELECT owner FROM scheduler_lease WHERE name='scheduler'").fetchone()
+        return row is not None and row["owner"] == owner
+    finally:
+        conn.close()
+
+
+def _release_lease(owner):
+    conn = get_db()
+    conn.execute("DELETE FROM scheduler_lease WHERE name='scheduler' AND owner=?", (owner,))
+    conn.commit()
+    conn.close()
+
+
+def _loop(app, stop):
+    owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    next_runs = None
+
+    while not stop.wait(TICK_SECONDS + random.uniform(0, TICK_JITTER)):
+        with app.app_context():
+            try:
+                if not _acquire_lease(owner):
+                    next_runs = None  # re-read history if we become leader later
+                    continue
+
+                if next_runs is None:
+                    # Jobs that never ran wait a full interval, so a fresh
+                    # deploy does not VACUUM a few seconds after start-up
+                    last = _last_runs()
+                    now = time.time()
+                    next_runs = {
+                        job.name: last.get(job.name, now) + job.interval + random.uniform(0, job.jitter)
+                        for job in JOBS
+                    }
+
+                for job in JOBS:
+                    if stop.is_set() or time.time() < next_runs[job.name]:
+                        continue
+                    if not _acquire_lease(owner):
+                        break
+                    run_job(job)
+                    next_runs[job.name] = time.time() + job.interval + random.uniform(0, job.jitter)
+            except Exception:
+                app.logger.exception("Scheduler tick failed")
+
+    with app.app_context():
+        _release_lease(owner)
+
+
+_started = []
+
+
+def start_scheduler(app):
+    """Start the scheduler thread for `app`; stopped by stop_scheduler() or at exit."""
+    stop = threading.Event()
+    thread = threading.Thread(target=_loop, args=(app, stop), name="scheduler", daemon=True)
+    thread.start()
+    app.extensions["scheduler"] = (stop, thread)
+    if not _started:
+        atexit.register(stop_scheduler)
+    _started.append(app)
+
+
+def stop_scheduler(app=None, timeout=STOP_TIMEOUT):
+    """
+    Stop the scheduler of `app` (every started one if None) and wait for it
+    to finish its current job and release the lease.
+    """
+    apps = [app] if app is not None else list(_started)
+    threads = []
+    for a in apps:
+        stop, thread = a.extensions.pop("scheduler", (None, None))
+        if stop is not None:
+            stop.set()
+            threads.append(thread)
+        if a in _started:
+            _started.remove(a)
+    for thread in threads:
+        thread.join(timeout)
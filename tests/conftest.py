@@ -0,0 +1,25 @@
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope="session")
+def build_folder(tmp_path_factory):
+    # Built once by the first app; later apps see it is current
+    return str(tmp_path_factory.mktemp("build"))
+
+
+@pytest.fixture
+def config(tmp_path, build_folder):
+    return {
+        "DATABASE": str(tmp_path / "users.db"),
+        "UPLOAD_FOLDER": str(tmp_path / "uploads"),
+        "ARCHIVE_FOLDER": str(tmp_path / "archive"),
+        "BUILD_FOLDER": build_folder,
+        "SCHEDULER_BATCH_SIZE": 2,
+    }
+
+
+@pytest.fixture
+def app(config):
+    return create_app({**config, "TESTING": True})
@@ -0,0 +1,91 @@
+import os
+
+import pytest
+
+from archive import academic_year, archive_finalized, available_years
+from db import get_db
+
+EMAIL = "student@example.com"
+
+
+@pytest.fixture
+def archived(app):
+    """One archived and one live leave, plus an archived notification."""
+    conn = get_db(app.config["DATABASE"])
+    user_id = conn.execute("INSERT INTO users (name, email) VALUES ('Student', ?)", (EMAIL,)).lastrowid
+    admin_id = conn.execute("INSERT INTO users (name, email, role) VALUES ('Warden', 'w@x.com', 'ADMIN')").lastrowid
+    leaves = [
+        ("APPROVED", "2023-09-01 09:00:00"),
+        ("REJECTED", "2023-10-01 09:00:00"),
+        ("PENDING", "2023-10-02 09:00:00"),
+    ]
+    ids = [
+        conn.execute("INSERT INTO leave_requests (user_id, status, created_at) VALUES (?, ?, ?)",
+                     (user_id, status, created)).lastrowid
+        for status, created in leaves
+    ]
+    conn.execute("""
+        INSERT INTO leave_approvals (leave_id, admin_id, status, approved_at)
+        VALUES (?, ?, 'APPROVED', '2023-09-02 09:00:00')
+    """, (ids[0], admin_id))
+    conn.executemany("INSERT INTO notifications (user_id, message, created_at) VALUES (?, ?, ?)", [
+        (user_id, "old", "2023-09-01 09:00:00"),
+        (user_id, "new", "2024-07-01 09:00:00"),
+    ])
+    conn.commit()
+    conn.close()
+
+    return archive_finalized(app.config["DATABASE"], app.config["ARCHIVE_FOLDER"], "2024-06-01", batch_size=1)
+
+
+def test_academic_year():
+    assert academic_year("2024-08-10 09:00:00") == "2024-25"
+    assert academic_year("2024-05-31 09:00:00") == "2023-24"
+
+
+def test_archive_moves_finalized_only(app, archived):
+    assert archived == {"leave_requests": 2, "leave_approvals": 1, "notifications": 1}
+    assert available_years(app.config["ARCHIVE_FOLDER"]) == ["2023-24"]
+    assert os.path.exists(os.path.join(app.config["ARCHIVE_FOLDER"], "leaves_2023-24.db"))
+
+
+def test_leave_history_reads_archives(app, archived):
+    client = app.test_client()
+    live = client.post("/leave-history", json={"email": EMAIL}).get_json()
+    assert [l["status"] for l in live] == ["PENDING"]
+
+    history = client.post("/leave-history", json={"email": EMAIL, "years": "all"}).get_json()
+    assert sorted(l["status"] for l in history) == ["APPROVED", "PENDING", "REJECTED"]
+    assert {l["archive"] for l in history} == {"live", "2023-24"}
+
+    approved = next(l for l in history if l["status"] == "APPROVED")
+    assert approved["approvals"] == [
+        {"status": "APPROVED", "approved_at": "2023-09-02 09:00:00", "admin_name": "Warden"}
+    ]
+
+
+def test_notifications_read_archives(app, archived):
+    client = app.test_client()
+    live = client.post("/get-notifications", json={"email": EMAIL}).get_json()
+    assert [n["message"] for n in live] == ["new"]
+
+    notes = client.post("/get-notifications", json={"email": EMAIL, "years": ["2023-24"]}).get_json()
+    assert [(n["message"], n["archive"]) for n in notes] == [("new", "live"), ("old", "2023-24")]
+
+
+def test_export_reads_archives(app, archived):
+    resp = app.test_client().get("/export-leaves?years=2023-24")
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True).count("\n") == 4  # header + 3 leaves
+
+
+def test_stats_keep_archived_leaves(app, archived):
+    stats = app.test_client().post("/user-stats", json={"email": EMAIL}).get_json()
+    assert stats["total"] == 3 and stats["approved"] == 1
+
+
+@pytest.mark.parametrize("url", ["/leave-history", "/get-notifications"])
+@pytest.mark.parametrize("years", [[2023], {"a": 1}, 5, ["2023-24", None], ["../users"]])
+def test_bad_years_are_rejected(app, archived, url, years):
+    resp = app.test_client().post(url, json={"email": EMAIL, "years": years})
+    assert resp.status_code == 400
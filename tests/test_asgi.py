@@ -0,0 +1,129 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from asgi import _environ, create_asgi_app
+from db import get_db
+
+EMAIL = "student@example.com"
+BOUNDARY = "testboundary"
+
+
+@pytest.fixture
+def asgi_app(config):
+    app = create_asgi_app(config)
+    conn = get_db(config["DATABASE"])
+    conn.execute("INSERT INTO users (name, email) VALUES ('Student', ?)", (EMAIL,))
+    conn.commit()
+    conn.close()
+    return app
+
+
+def call(app, method, path, chunks=(b"",), headers=(), disconnect=False):
+    """Run one request through the ASGI app; returns (status, headers, body)."""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+    if disconnect:
+        messages[-1:] = [{"type": "http.disconnect"}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": b"",
+        "http_version": "1.1", "scheme": "http", "root_path": "",
+        "client": ("10.0.0.1", 50000), "server": ("testserver", 80),
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+    }
+    asyncio.run(app(scope, receive, send))
+    if not sent:
+        return None, {}, b""
+    start = sent[0]
+    body = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+def multipart(doc_type, content, filename="id.pdf"):
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="email"\r\n\r\n{EMAIL}\r\n',
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="doc_type"\r\n\r\n{doc_type}\r\n',
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n",
+    ]
+    return "".join(parts).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def upload(app, body, size=7):
+    chunks = [body[i:i + size] for i in range(0, len(body), size)]
+    return call(app, "POST", "/upload-document", chunks, [
+        ("content-type", f"multipart/form-data; boundary={BOUNDARY}"),
+        ("content-length", str(len(body))),
+    ])
+
+
+def documents(app):
+    conn = get_db(app.flask_app.config["DATABASE"])
+    rows = conn.execute("SELECT doc_type, file_path FROM documents").fetchall()
+    conn.close()
+    return rows
+
+
+def test_streamed_upload(asgi_app):
+    status, _, body = upload(asgi_app, multipart("aadhar", b"%PDF first"))
+    assert status == 201, body
+    [doc] = documents(asgi_app)
+    with open(doc["file_path"], "rb") as f:
+        assert f.read() == b"%PDF first"
+
+    # A replacement removes the old file (no scheduler here) and no temp file is left
+    status, _, _ = upload(asgi_app, multipart("aadhar", b"%PDF second" * 1000), size=4096)
+    assert status == 201
+    [new] = documents(asgi_app)
+    folder = asgi_app.flask_app.config["UPLOAD_FOLDER"]
+    assert os.listdir(folder) == [os.path.basename(new["file_path"])]
+
+    metrics = asgi_app.flask_app.extensions["admission"].snapshot()
+    assert metrics["admitted"]["api.upload_document"] == 2
+    assert metrics["in_flight"] == {}
+
+
+def test_streamed_upload_rejects_bad_type(asgi_app):
+    status, _, _ = upload(asgi_app, multipart("aadhar", b"MZ", filename="x.exe"))
+    assert status == 400
+    assert documents(asgi_app) == []
+    assert os.listdir(asgi_app.flask_app.config["UPLOAD_FOLDER"]) == []
+
+
+def test_chunked_body_reaches_flask(asgi_app):
+    # No Content-Length: the bridge must tell Flask how much it buffered
+    body = json.dumps({"email": "nobody@example.com", "password": "wrong"}).encode()
+    status, _, _ = call(asgi_app, "POST", "/login", [body[:10], body[10:]], [
+        ("content-type", "application/json"),
+        ("transfer-encoding", "chunked"),
+    ])
+    assert status == 401
+
+
+def test_oversized_body_is_413(asgi_app):
+    asgi_app.flask_app.config["MAX_CONTENT_LENGTH"] = 10
+    status, _, _ = call(asgi_app, "POST", "/login", [b"x" * 8, b"x" * 8])
+    assert status == 413
+
+
+def test_disconnect_gets_no_response(asgi_app):
+    status, _, _ = call(asgi_app, "POST", "/login", [b"{}", b""], disconnect=True)
+    assert status is None
+
+
+def test_errors_stream_takes_text():
+    # Flask's default log handler writes str to wsgi.errors
+    scope = {"method": "GET", "path": "/", "query_string": b"", "http_version": "1.1", "headers": []}
+    _environ(scope, b"")["wsgi.errors"].write("")
@@ -0,0 +1,94 @@
+import gzip
+import os
+import re
+import time
+
+import pytest
+
+from app import create_app
+from assets import brotli, minify_js, rewrite_api_base
+
+
+def test_rewrite_api_base():
+    js = 'fetch("http://127.0.0.1:5000/login"); fetch(`http://127.0.0.1:5000/doc/${id}`)'
+    assert rewrite_api_base(js) == (
+        'fetch(window.API_BASE + "/login"); fetch(`${window.API_BASE}/doc/${id}`)'
+    )
+
+
+def test_minify_js_keeps_template_literals():
+    js = (
+        "  // gone\n"
+        "  const html = `<ul>\n"
+        "      // part of the string\n"
+        "      <li>${ok ? `a\n"
+        "  b` : \"}\"}</li>\n"
+        "  </ul>`;   \n"
+        "\n"
+        "  let url = 'http://x//y';\n"
+    )
+    assert minify_js(js) == (
+        "const html = `<ul>\n"
+        "      // part of the string\n"
+        "      <li>${ok ? `a\n"
+        "  b` : \"}\"}</li>\n"
+        "  </ul>`;\n"
+        "let url = 'http://x//y';"
+    )
+
+
+def test_page_fills_api_base(config):
+    app = create_app({**config, "API_BASE_URL": "https://api.example.com"})
+    html = app.test_client().get("/login.html").get_data(as_text=True)
+    assert 'window.API_BASE = "https://api.example.com";' in html
+    assert "<style>" not in html
+    assert "127.0.0.1:5000" not in html
+
+
+def test_page_is_conditional(app):
+    client = app.test_client()
+    resp = client.get("/")
+    assert resp.status_code == 200
+    assert resp.cache_control.max_age == 60
+
+    again = client.get("/", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_assets_are_immutable_and_precompressed(app):
+    client = app.test_client()
+    html = client.get("/login.html").get_data(as_text=True)
+    src = re.search(r'<script src="(/assets/[^"]+\.js)"', html).group(1)
+
+    plain = client.get(src)
+    assert "immutable" in plain.headers["Cache-Control"]
+    assert plain.cache_control.max_age == 365 * 24 * 60 * 60
+    assert "Content-Encoding" not in plain.headers
+    assert "127.0.0.1:5000" not in plain.get_data(as_text=True)
+
+    zipped = client.get(src, headers={"Accept-Encoding": "gzip"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert zipped.headers["Vary"] == "Accept-Encoding"
+    assert gzip.decompress(zipped.data) == plain.data
+
+    if brotli is None:
+        pytest.skip("Brotli not installed")
+    best = client.get(src, headers={"Accept-Encoding": "gzip, br"})
+    assert best.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(best.data) == plain.data
+
+
+def test_build_on_startup_when_stale(config, tmp_path):
+    source = tmp_path / "pages"
+    source.mkdir()
+    page = source / "login.html"
+    page.write_text("<html><head></head><body>v1</body></html>")
+    config = {**config, "FRONTEND_FOLDER": str(source), "BUILD_FOLDER": str(tmp_path / "out")}
+
+    assert b"v1" in create_app(config).test_client().get("/").data
+
+    page.write_text("<html><head></head><body>v2</body></html>")
+    later = time.time() + 5
+    os.utime(page, (later, later))
+    assert b"v2" in create_app(config).test_client().get("/").data
@@ -0,0 +1,40 @@
+import db
+from db import FIXED_ADMINS, SCHEMA_FINGERPRINT, bootstrap_db, get_db, seed_admins
+
+
+def test_bootstrap_once_fingerprint_is_stored(tmp_path):
+    path = str(tmp_path / "users.db")
+    assert bootstrap_db(path)
+    assert bootstrap_db(path) is False
+
+    # A fresh process has no in-memory cache and relies on user_version
+    db._bootstrapped.discard(path)
+    assert bootstrap_db(path) is False
+
+    conn = get_db(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_FINGERPRINT
+    conn.close()
+
+
+def test_bootstrap_reapplies_on_fingerprint_change(tmp_path):
+    path = str(tmp_path / "users.db")
+    bootstrap_db(path)
+    conn = get_db(path)
+    conn.execute("PRAGMA user_version = 1")
+    conn.close()
+
+    db._bootstrapped.discard(path)
+    assert bootstrap_db(path)
+
+
+def test_seed_admins_is_idempotent(tmp_path):
+    path = str(tmp_path / "users.db")
+    bootstrap_db(path)
+
+    assert seed_admins(path, "secret") == [email for _, _, email in FIXED_ADMINS]
+    assert seed_admins(path, "secret") == []
+
+    conn = get_db(path)
+    roles = conn.execute("SELECT role, COUNT(*) FROM users GROUP BY role").fetchall()
+    conn.close()
+    assert [tuple(r) for r in roles] == [("ADMIN", len(FIXED_ADMINS))]
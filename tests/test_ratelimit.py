@@ -0,0 +1,102 @@
+import pytest
+
+from app import create_app
+from db import FIXED_ADMINS, seed_admins
+from ratelimit import Admission, MemoryBuckets, SqliteBuckets, client_ip
+
+
+@pytest.mark.parametrize("make_buckets", [
+    lambda tmp_path: MemoryBuckets(),
+    lambda tmp_path: SqliteBuckets(str(tmp_path / "ratelimit.db")),
+])
+def test_token_bucket_refills(tmp_path, monkeypatch, make_buckets):
+    now = [1000.0]
+    monkeypatch.setattr("ratelimit.time.monotonic", lambda: now[0])
+    monkeypatch.setattr("ratelimit.time.time", lambda: now[0])
+    buckets = make_buckets(tmp_path)
+
+    assert buckets.take("k", 2, 0.5) == 0
+    assert buckets.take("k", 2, 0.5) == 0
+    assert buckets.take("k", 2, 0.5) == pytest.approx(2)
+    now[0] += 2
+    assert buckets.take("k", 2, 0.5) == 0
+    assert buckets.take("other", 2, 0.5) == 0
+
+
+def test_memory_buckets_drop_least_recent():
+    buckets = MemoryBuckets(max_keys=2)
+    buckets.take("a", 1, 0.001)
+    buckets.take("b", 1, 0.001)
+    buckets.take("c", 1, 0.001)
+    assert buckets.take("a", 1, 0.001) == 0  # forgotten, so full again
+    assert buckets.take("c", 1, 0.001) > 0
+
+
+def test_account_bucket_needs_string_email():
+    admission = Admission({"api.login": {"account": (1, 0.001)}}, 0, MemoryBuckets())
+    assert admission.check_rate("api.login", "1.2.3.4", 5) is None
+    assert admission.check_rate("api.login", "1.2.3.4", 5) is None
+    assert admission.check_rate("api.login", "1.2.3.4", " A@x.com") is None
+    assert admission.check_rate("api.login", "1.2.3.4", "a@x.com")[0] == "rate_limited_account"
+
+
+def test_login_bucket_is_per_account_and_ip():
+    admission = Admission({"api.login": {"account_ip": (1, 0.001)}}, 0, MemoryBuckets())
+    assert admission.check_rate("api.login", "1.2.3.4", "a@x.com") is None
+    assert admission.check_rate("api.login", "1.2.3.4", "a@x.com")[0] == "rate_limited_account_ip"
+    assert admission.check_rate("api.login", "5.6.7.8", "a@x.com") is None
+
+
+def test_failed_logins_elsewhere_do_not_lock_out(config):
+    app = create_app({**config, "TRUSTED_PROXIES": 1})
+    seed_admins(config["DATABASE"], "secret")
+    email = FIXED_ADMINS[0][2]
+    client = app.test_client()
+
+    def login(password, ip):
+        return client.post("/login", json={"email": email, "password": password},
+                           headers={"X-Forwarded-For": ip}).status_code
+
+    assert [login("guess", f"10.0.0.{i}") for i in range(5)] == [401] * 5
+    assert login("secret", "10.9.9.9") == 200
+
+    # Guessing from one address still runs out
+    assert [login("guess", "10.0.0.0") for _ in range(5)] == [401] * 4 + [429]
+
+
+def test_rate_limit_returns_429(app):
+    client = app.test_client()
+    codes = [client.post("/login", json={"email": 5, "password": "x"}).status_code for _ in range(21)]
+    assert codes[:20] == [401] * 20
+    resp = client.post("/login", json={"email": 5, "password": "x"})
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+
+def test_trusted_proxy_buckets_per_client(config):
+    app = create_app({**config, "TRUSTED_PROXIES": 1})
+    client = app.test_client()
+    for i in range(5):
+        client.post("/register", json={}, headers={"X-Forwarded-For": "10.0.0.1"})
+    blocked = client.post("/register", json={}, headers={"X-Forwarded-For": "10.0.0.1"})
+    other = client.post("/register", json={}, headers={"X-Forwarded-For": "10.0.0.2"})
+    assert blocked.status_code == 429
+    assert other.status_code == 400
+
+    assert client_ip("127.0.0.1", "spoofed, 10.0.0.3", 1) == "10.0.0.3"
+    assert client_ip("127.0.0.1", "10.0.0.3", 0) == "127.0.0.1"
+
+
+def test_shed_when_slots_are_busy(app):
+    admission = app.extensions["admission"]
+    admission.queue_budget = 0.01
+    for _ in range(2):
+        assert admission.enter("api.register")
+
+    resp = app.test_client().post("/register", json={})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+    assert admission.snapshot()["rejected"]["api.register"] == {"shed_concurrency": 1}
+
+    admission.leave("api.register")
+    assert app.test_client().post("/register", json={}).status_code == 400
@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+
+import scheduler
+from db import get_db
+
+
+def add_user(conn, email="student@example.com"):
+    cur = conn.execute("INSERT INTO users (name, email, role) VALUES ('Student', ?, 'USER')", (email,))
+    return cur.lastrowid
+
+
+def add_leave(conn, user_id, status, created_at, from_date="2024-01-10"):
+    cur = conn.execute("""
+        INSERT INTO leave_requests (user_id, from_date, status, created_at)
+        VALUES (?, ?, ?, ?)
+    """, (user_id, from_date, status, created_at))
+    return cur.lastrowid
+
+
+# ==============================
+# SCHEDULER
+# ==============================
+def test_lease_handoff(app, monkeypatch):
+    with app.app_context():
+        assert scheduler._acquire_lease("a")
+        assert not scheduler._acquire_lease("b")
+        assert scheduler._acquire_lease("a")  # renewal
+
+        scheduler._release_lease("b")  # not the holder: no effect
+        assert not scheduler._acquire_lease("b")
+        scheduler._release_lease("a")
+        assert scheduler._acquire_lease("b")
+
+        # An expired lease is taken over without a release
+        later = time.time() + scheduler.LEASE_SECONDS + 1
+        monkeypatch.setattr(scheduler.time, "time", lambda: later)
+        assert scheduler._acquire_lease("a")
+
+
+def test_timeout_records_committed_rows(app):
+    def slow(conn, deadline, batch_size, progress):
+        def step(cur, limit):
+            cur.execute("INSERT INTO notifications (message) VALUES ('x')")
+            if progress["rows"] == 2:
+                time.sleep(0.2)
+            return limit  # never short, so only the deadline stops it
+
+        scheduler._batched(conn, deadline, batch_size, progress, step)
+
+    job = scheduler.Job("slow", slow, interval=60, timeout=0.1)
+    with app.app_context():
+        assert scheduler.run_job(job) == "timeout"
+        conn = get_db()
+        run = conn.execute("SELECT rows, status FROM job_runs WHERE job='slow'").fetchone()
+        inserted = conn.execute("SELECT COUNT(*) FROM notifications").fetchone()[0]
+        conn.close()
+
+    assert run["status"] == "timeout"
+    assert run["rows"] == 4 and inserted == 2  # two batches of SCHEDULER_BATCH_SIZE
+
+
+def test_expire_stale_leaves_in_batches(app):
+    with app.app_context():
+        conn = get_db()
+        user_id = add_user(conn)
+        for _ in range(5):
+            add_leave(conn, user_id, "PENDING", "2024-01-01 09:00:00")
+        conn.commit()
+        conn.close()
+
+        assert scheduler.run_job(scheduler.Job("expire", scheduler.expire_stale_leaves, 60)) == "ok"
+        conn = get_db()
+        statuses = {r[0] for r in conn.execute("SELECT status FROM leave_requests")}
+        run = conn.execute("SELECT rows FROM job_runs").fetchone()
+        conn.close()
+
+    assert statuses == {"EXPIRED"}
+    assert run["rows"] == 5
+
+
+def test_delete_replaced_files_survives_bad_paths(app, tmp_path):
+    stale = tmp_path / "uploads" / "old.pdf"
+    stale.write_bytes(b"old")
+    live = tmp_path / "uploads" / "live.pdf"
+    live.write_bytes(b"live")
+    folder = tmp_path / "uploads" / "folder"
+    folder.mkdir()
+
+    with app.app_context():
+        conn = get_db()
+        conn.execute("INSERT INTO documents (file_path) VALUES (?)", (str(live),))
+        conn.executemany("INSERT INTO file_deletions (file_path) VALUES (?)", [
+            (str(folder),), (str(tmp_path / "missing.pdf"),), (str(live),), (str(stale),),
+        ])
+        conn.commit()
+        conn.close()
+
+        assert scheduler.run_job(scheduler.Job("delete", scheduler.delete_replaced_files, 60)) == "ok"
+        conn = get_db()
+        left = conn.execute("SELECT COUNT(*) FROM file_deletions").fetchone()[0]
+        conn.close()
+
+    assert left == 0
+    assert not stale.exists()
+    assert live.exists()
+
+
+def test_never_run_jobs_wait_an_interval(app, monkeypatch):
+    ran = []
+    monkeypatch.setattr(scheduler, "TICK_SECONDS", 0)
+    monkeypatch.setattr(scheduler, "TICK_JITTER", 0)
+    monkeypatch.setattr(scheduler, "JOBS", [scheduler.Job("later", None, interval=3600, jitter=0)])
+    monkeypatch.setattr(scheduler, "run_job", ran.append)
+
+    stop = threading.Event()
+    thread = threading.Thread(target=scheduler._loop, args=(app, stop))
+    thread.start()
+    time.sleep(0.2)
+    stop.set()
+    thread.join()
+
+    assert ran == []
+    with app.app_context():
+        assert scheduler._acquire_lease("someone-else")  # released on stop
+
+
+def test_vacuum_only_when_worth_it(app):
+    job = next(j for j in scheduler.JOBS if j.name == "vacuum")
+    assert job.timeout < 30  # get_db's busy timeout
+
+    def freelist():
+        conn = get_db()
+        free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        conn.close()
+        return free
+
+    with app.app_context():
+        conn = get_db()
+        conn.executemany("INSERT INTO notifications (message) VALUES (?)", [("x" * 500,)] * 2000)
+        conn.commit()
+        conn.execute("DELETE FROM notifications WHERE id <= 200")  # ~10% of pages
+        conn.commit()
+        conn.close()
+        few = freelist()
+        assert few > 0
+        assert scheduler.run_job(job) == "ok"
+        assert freelist() == few
+
+        conn = get_db()
+        conn.execute("DELETE FROM notifications")
+        conn.commit()
+        conn.close()
+        assert scheduler.run_job(job) == "ok"
+        assert freelist() == 0